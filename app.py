@@ -1,4 +1,5 @@
 from datetime import datetime
+import hashlib
 import pandas as pd
 import streamlit as st
 import os
@@ -27,8 +28,98 @@ def salvar_tipos_afastamento(df):
     if not os.path.exists("data"):
         os.makedirs("data")
     df.to_pickle("data/tipos_afastamento.pkl")
+
+def carregar_tabela_premios():
+    # Faixas de horas mensais -> valor do prêmio; Local/Cargo vazios valem para todos
+    if os.path.exists("data/tabela_premios.pkl"):
+        return pd.read_pickle("data/tabela_premios.pkl")
+    return pd.DataFrame({
+        "Horas_Min": [220, 0],
+        "Horas_Max": [220, 120],
+        "Valor": [300.00, 150.00],
+        "Local": ["", ""],
+        "Cargo": ["", ""]
+    })
+
+def salvar_tabela_premios(df):
+    # Verificar se o diretório 'data' existe e criá-lo se não existir
+    if not os.path.exists("data"):
+        os.makedirs("data")
+    df.to_pickle("data/tabela_premios.pkl")
+
+@st.cache_data(show_spinner=False)
+def carregar_funcionarios(conteudo):
+    # Leitura e conversão das datas ficam em cache junto com o arquivo carregado
+    df = pd.read_excel(io.BytesIO(conteudo))
+    df.columns = [
+        "Matricula", "Nome_Funcionario", "Cargo", 
+        "Codigo_Local", "Nome_Local", "Qtd_Horas_Mensais",
+        "Tipo_Contrato", "Data_Termino_Contrato", 
+        "Dias_Experiencia", "Salario_Mes_Atual", "Data_Admissao"
+    ]
+    df['Data_Admissao'] = pd.to_datetime(df['Data_Admissao'], format='%d/%m/%Y')
+    return df
+
+@st.cache_data(show_spinner=False)
+def carregar_ausencias(conteudo, df_tipos):
+    # Os tipos de afastamento fazem parte da chave do cache
+    return processar_ausencias(pd.read_excel(io.BytesIO(conteudo)), df_tipos)
+
+@st.cache_data(show_spinner=False)
+def calcular_resultado(conteudo_funcionarios, conteudo_ausencias, df_tipos, df_tabela):
+    df_funcionarios = carregar_funcionarios(conteudo_funcionarios)
+    df_funcionarios['Valor_Premio_Tabela'] = calcular_valores_premio(df_funcionarios, df_tabela).fillna(0.0)
+    df_ausencias = carregar_ausencias(conteudo_ausencias, df_tipos)
+    return calcular_premio(df_funcionarios, df_ausencias)
+
+def normalizar_local(serie):
+    # Códigos numéricos lidos do Excel como float ("101.0") viram "101"
+    return serie.fillna('').astype(str).str.strip().str.replace(r'\.0+$', '', regex=True)
+
+@st.cache_data(show_spinner=False)
+def calcular_valores_premio(df_funcionarios, df_tabela):
+    # Cruzar todos os funcionários com a tabela de uma vez só
+    tabela = df_tabela.reset_index(drop=True).copy()
+    for coluna in ['Local', 'Cargo']:
+        if coluna not in tabela.columns:
+            tabela[coluna] = ''
+        tabela[coluna] = tabela[coluna].fillna('').astype(str).str.strip()
+    # Local pode ser o nome (texto original) ou o código do local (normalizado)
+    tabela['Codigo_Local'] = normalizar_local(tabela['Local'])
+    tabela['Especificidade'] = (tabela['Local'] != '').astype(int) + (tabela['Cargo'] != '').astype(int)
+    tabela['Ordem'] = tabela.index
+    
+    funcionarios = pd.DataFrame({
+        'Posicao': range(len(df_funcionarios)),
+        'Horas': pd.to_numeric(df_funcionarios['Qtd_Horas_Mensais'], errors='coerce').to_numpy(),
+        'Local_Funcionario': df_funcionarios['Nome_Local'].fillna('').astype(str).str.strip().to_numpy(),
+        'Codigo_Local_Funcionario': normalizar_local(df_funcionarios['Codigo_Local']).to_numpy(),
+        'Cargo_Funcionario': df_funcionarios['Cargo'].fillna('').astype(str).str.strip().to_numpy()
+    })
+    
+    pares = funcionarios.merge(tabela, how='cross')
+    pares = pares[
+        pares['Horas'].between(pares['Horas_Min'], pares['Horas_Max']) &
+        ((pares['Local'] == '') | (pares['Local'] == pares['Local_Funcionario']) |
+         (pares['Codigo_Local'] == pares['Codigo_Local_Funcionario'])) &
+        ((pares['Cargo'] == '') | (pares['Cargo'] == pares['Cargo_Funcionario']))
+    ]
+    
+    # A linha mais específica (Local e Cargo preenchidos) prevalece; empate fica com a ordem da tabela
+    pares = pares.sort_values(['Especificidade', 'Ordem'], ascending=[False, True])
+    valores = pares.drop_duplicates('Posicao').set_index('Posicao')['Valor']
+    
+    # Funcionários sem faixa correspondente ficam com NaN
+    return pd.Series(valores.reindex(range(len(df_funcionarios))).to_numpy(), index=df_funcionarios.index)
+
+def mascara_data_limite_admissao(df, data_limite_admissao):
+    return df['Data_Admissao'] <= pd.Timestamp(data_limite_admissao)
+
+def aplicar_data_limite_admissao(df_resultado, data_limite_admissao):
+    mascara = mascara_data_limite_admissao(df_resultado, data_limite_admissao)
+    return df_resultado[mascara].reset_index(drop=True)
     
-def processar_ausencias(df):
+def processar_ausencias(df, df_tipos):
     # Renomear colunas e configurar dados iniciais
     df = df.rename(columns={
         "Matrícula": "Matricula",
@@ -88,8 +179,7 @@ def processar_ausencias(df):
         axis=1
     )
     
-    # Carregar tipos de afastamento
-    df_tipos = carregar_tipos_afastamento()
+    # Tipos de afastamento conhecidos
     tipos_conhecidos = df_tipos['tipo'].unique() if not df_tipos.empty else []
 
     # Identificar afastamentos desconhecidos
@@ -116,7 +206,7 @@ def processar_ausencias(df):
     # Retornar DataFrame atualizado
     return df
 
-def calcular_premio(df_funcionarios, df_ausencias, data_limite_admissao):
+def calcular_premio(df_funcionarios, df_ausencias):
     # Afastamentos que impedem o recebimento do prêmio (Não tem direito)
     afastamentos_impeditivos = [
         "Declaração Acompanhante", "Feriado", "Emenda Feriado", 
@@ -139,9 +229,6 @@ def calcular_premio(df_funcionarios, df_ausencias, data_limite_admissao):
         "Folga Gestor", "Abonado Gerencia Loja", "Abono Administrativo"
     ]
     
-    df_funcionarios['Data_Admissao'] = pd.to_datetime(df_funcionarios['Data_Admissao'], format='%d/%m/%Y')
-    df_funcionarios = df_funcionarios[df_funcionarios['Data_Admissao'] <= pd.to_datetime(data_limite_admissao)]
-    
     resultados = []
     
     # Agrupar ausências por matrícula para considerar todas as ocorrências juntas
@@ -229,12 +316,8 @@ def calcular_premio(df_funcionarios, df_ausencias, data_limite_admissao):
                     tem_apenas_permitidos = False
                     break
         
-        # Definir valor do prêmio com base nas horas mensais
-        valor_premio = 0
-        if func['Qtd_Horas_Mensais'] == 220:
-            valor_premio = 300.00
-        elif func['Qtd_Horas_Mensais'] <= 120:
-            valor_premio = 150.00
+        # Valor do prêmio já calculado pela tabela de valores
+        valor_premio = func['Valor_Premio_Tabela']
         
         # Definir status padrão
         status = "Não tem direito"
@@ -323,6 +406,44 @@ def main():
         st.subheader("Base de Ausências")
         uploaded_ausencias = st.file_uploader("Carregar base de ausências", type=['xlsx'])
         
+        st.subheader("Tabela de Valores do Prêmio")
+        uploaded_tabela = st.file_uploader(
+            "Atualizar tabela de valores",
+            type=['xlsx'],
+            help="Colunas 'Horas Min', 'Horas Max', 'Valor' e opcionais 'Local' (nome ou código do local) e 'Cargo'"
+        )
+        
+        if uploaded_tabela is not None:
+            try:
+                df_tabela_nova = pd.read_excel(uploaded_tabela)
+                # Verificar se as colunas obrigatórias estão presentes
+                if all(coluna in df_tabela_nova.columns for coluna in ['Horas Min', 'Horas Max', 'Valor']):
+                    df_tabela = df_tabela_nova.rename(columns={'Horas Min': 'Horas_Min', 'Horas Max': 'Horas_Max'})
+                    for coluna in ['Horas_Min', 'Horas_Max', 'Valor']:
+                        df_tabela[coluna] = pd.to_numeric(df_tabela[coluna], errors='coerce')
+                    for coluna in ['Local', 'Cargo']:
+                        if coluna not in df_tabela.columns:
+                            df_tabela[coluna] = ''
+                        df_tabela[coluna] = df_tabela[coluna].fillna('')
+                    
+                    # Validar valores numéricos e faixas antes de salvar
+                    if df_tabela[['Horas_Min', 'Horas_Max', 'Valor']].isna().any().any():
+                        st.error("As colunas 'Horas Min', 'Horas Max' e 'Valor' devem conter apenas números, sem células vazias")
+                    elif (df_tabela['Horas_Min'] < 0).any() or (df_tabela['Valor'] < 0).any():
+                        st.error("'Horas Min' e 'Valor' não podem ser negativos")
+                    elif (df_tabela['Horas_Min'] > df_tabela['Horas_Max']).any():
+                        st.error("Há linhas com 'Horas Min' maior que 'Horas Max'")
+                    else:
+                        salvar_tabela_premios(df_tabela[['Horas_Min', 'Horas_Max', 'Valor', 'Local', 'Cargo']])
+                        st.success("Tabela de valores atualizada!")
+                else:
+                    st.error("Arquivo deve conter colunas 'Horas Min', 'Horas Max' e 'Valor' (opcionais: 'Local' com nome ou código do local, 'Cargo')")
+            except Exception as e:
+                st.error(f"Erro ao processar arquivo: {str(e)}")
+        
+        with st.expander("Ver tabela de valores atual"):
+            st.dataframe(carregar_tabela_premios())
+        
         st.subheader("Tipos de Afastamento")
         uploaded_tipos = st.file_uploader("Atualizar tipos de afastamento", type=['xlsx'])
         
@@ -342,16 +463,23 @@ def main():
     
     if uploaded_func is not None and uploaded_ausencias is not None and data_limite is not None:
         try:
-            df_funcionarios = pd.read_excel(uploaded_func)
-            df_funcionarios.columns = [
-                "Matricula", "Nome_Funcionario", "Cargo", 
-                "Codigo_Local", "Nome_Local", "Qtd_Horas_Mensais",
-                "Tipo_Contrato", "Data_Termino_Contrato", 
-                "Dias_Experiencia", "Salario_Mes_Atual", "Data_Admissao"
-            ]
+            df_tipos = carregar_tipos_afastamento()
+            df_tabela = carregar_tabela_premios()
+            conteudo_func = uploaded_func.getvalue()
+            conteudo_ausencias = uploaded_ausencias.getvalue()
+            
+            # Leitura e processamento ficam em cache; mudar a data limite só reaplica a máscara
+            df_funcionarios = carregar_funcionarios(conteudo_func)
+            valores_premio = calcular_valores_premio(df_funcionarios, df_tabela)
+            
+            # Avisar apenas sobre funcionários que entram no corte de admissão
+            sem_faixa = valores_premio.isna() & mascara_data_limite_admissao(df_funcionarios, data_limite)
+            if sem_faixa.any():
+                logging.warning(f"Funcionários sem faixa na tabela de valores: {df_funcionarios.loc[sem_faixa, 'Matricula'].tolist()}")
+                st.warning("Há funcionários cuja carga horária não se encaixa em nenhuma faixa da tabela de valores (prêmio = R$ 0,00):")
+                st.dataframe(df_funcionarios.loc[sem_faixa, ['Matricula', 'Nome_Funcionario', 'Cargo', 'Nome_Local', 'Qtd_Horas_Mensais']])
             
-            df_ausencias = pd.read_excel(uploaded_ausencias)
-            df_ausencias = processar_ausencias(df_ausencias)
+            df_ausencias = carregar_ausencias(conteudo_ausencias, df_tipos)
             
             # Verificar e exibir afastamentos desconhecidos
             if not df_ausencias['Afastamentos_Desconhecidos'].str.strip().eq('').all():
@@ -359,14 +487,23 @@ def main():
                 st.dataframe(df_ausencias[['Matricula', 'Afastamentos_Desconhecidos']])
                 st.info("Atualize os tipos de afastamento para corrigir essas inconsistências.")
             
-            df_resultado = calcular_premio(df_funcionarios, df_ausencias, data_limite)
+            df_resultado = calcular_resultado(conteudo_func, conteudo_ausencias, df_tipos, df_tabela)
+            df_resultado = aplicar_data_limite_admissao(df_resultado, data_limite)
             
             st.subheader("Resultado do Cálculo de Prêmios")
             
             df_mostrar = df_resultado
             
             # Editar resultados
-            df_mostrar = editar_valores_status(df_mostrar)
+            # Edições são descartadas quando arquivos, tabelas ou data limite mudam
+            chave_resultado = (
+                hashlib.md5(conteudo_func).hexdigest(),
+                hashlib.md5(conteudo_ausencias).hexdigest(),
+                pd.util.hash_pandas_object(df_tipos.astype(str), index=False).sum(),
+                pd.util.hash_pandas_object(df_tabela.astype(str), index=False).sum(),
+                str(data_limite)
+            )
+            df_mostrar = editar_valores_status(df_mostrar, chave_resultado)
             
             # Mostrar métricas
             st.metric("Total de Funcionários com Direito", len(df_mostrar[df_mostrar['Status'] == "Tem direito"]))
@@ -12,9 +12,12 @@ def salvar_alteracoes(idx, novo_status, novo_valor, nova_obs, nome):
     st.session_state.last_saved = nome
     st.session_state.show_success = True
 
-def editar_valores_status(df):
-    if 'modified_df' not in st.session_state:
+def editar_valores_status(df, chave_resultado=None):
+    # Recriar a cópia editável quando o resultado de entrada mudar
+    if 'modified_df' not in st.session_state or st.session_state.get('chave_resultado') != chave_resultado:
         st.session_state.modified_df = df.copy()
+        st.session_state.chave_resultado = chave_resultado
+        st.session_state.expanded_item = None
     
     if 'expanded_item' not in st.session_state:
         st.session_state.expanded_item = None
@@ -105,7 +108,6 @@ def editar_valores_status(df):
                 novo_valor = st.number_input(
                     "Valor do Prêmio",
                     min_value=0.0,
-                    max_value=1000.0,
                     value=float(row['Valor_Premio']),
                     step=50.0,
                     format="%.2f",